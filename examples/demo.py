@@ -1,22 +1,41 @@
 """
-Example usage of the Simple Agent.
-Demonstrates programmatic interaction with the agent.
+Example usage of the agents.
+Demonstrates programmatic interaction with AdvancedAgent (concurrent sessions)
+and SimpleAgent (batch processing and custom tools).
 """
 
+import asyncio
+import contextlib
+import io
 import os
 import sys
 
 # Add src to path for direct execution
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
-from simple_agent import SimpleAgent  # noqa: E402
+from simple_agent import AdvancedAgent, SimpleAgent  # noqa: E402
 
 
-def demo_agent():
+async def run_session(prompts: list[str]) -> tuple[AdvancedAgent, list[tuple]]:
+    """Run one conversation turn by turn on its own agent."""
+    agent = AdvancedAgent()
+    turns = []
+
+    for user_input in prompts:
+        try:
+            response, action_results = await agent.arun_step(user_input)
+            turns.append((user_input, response, action_results, None))
+        except Exception as e:
+            turns.append((user_input, "", [], e))
+
+    return agent, turns
+
+
+async def demo_agent():
     """Demonstrate the agent with a series of predefined interactions."""
 
     print("=" * 60)
-    print("Simple Agent - Programmatic Demo")
+    print("Advanced Agent - Programmatic Demo")
     print("=" * 60)
 
     if not os.getenv("ANTHROPIC_API_KEY"):
@@ -24,6 +43,73 @@ def demo_agent():
         print("Please create a .env file with your API key")
         return
 
+    # Turns that depend on each other (save then recall) share a session;
+    # independent sessions run concurrently, each with its own agent.
+    demo_sessions = [
+        ["Hello! What can you do?"],
+        ["Calculate 123 * 456", "What's 2^10?"],
+        [
+            "Remember that my favorite color is blue",
+            "What do you remember about my favorite color?",
+        ],
+        ["Save a note: Call dentist on Friday", "Search your memory for dentist"],
+    ]
+
+    sessions = await asyncio.gather(
+        *(run_session(prompts) for prompts in demo_sessions)
+    )
+
+    # Collect the report and write it in one go rather than line by line
+    report = io.StringIO()
+    with contextlib.redirect_stdout(report):
+        total = sum(len(prompts) for prompts in demo_sessions)
+        i = 0
+        for _, turns in sessions:
+            for user_input, response, action_results, error in turns:
+                i += 1
+                print(f"\n{'=' * 60}")
+                print(f"Interaction {i}/{total}")
+                print(f"{'=' * 60}")
+                print(f"\n>> User: {user_input}")
+
+                if error is not None:
+                    print(f"\nError: {error}")
+                    continue
+
+                if action_results:
+                    print("\n[Actions]")
+                    for result in action_results:
+                        print(f"   {result['tool']}: {result['output']}")
+
+                if response:
+                    print(f"\n>> Agent: {response}")
+
+        memory = [note for agent, _ in sessions for note in agent.memory]
+
+        print(f"\n\n{'=' * 60}")
+        print("Demo Complete!")
+        print(f"{'=' * 60}")
+        print(
+            f"\nProcessed {total} interactions in {len(sessions)} concurrent sessions"
+        )
+        print(f"Memory contains {len(memory)} saved notes:")
+        for note in memory:
+            print(f"  - {note}")
+
+    sys.stdout.write(report.getvalue())
+    sys.stdout.flush()
+
+
+def batch_demo():
+    """Process independent prompts in one Message Batches API request."""
+    print("\n" + "=" * 60)
+    print("Batch Demo (Message Batches API)")
+    print("=" * 60)
+
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        print("\nError: ANTHROPIC_API_KEY not found in environment")
+        return
+
     agent = SimpleAgent()
 
     demo_conversations = [
@@ -36,33 +122,18 @@ def demo_agent():
         "Search your memory for dentist",
     ]
 
-    for i, user_input in enumerate(demo_conversations, 1):
-        print(f"\n{'=' * 60}")
-        print(f"Interaction {i}/{len(demo_conversations)}")
-        print(f"{'=' * 60}")
-        print(f"\n>> User: {user_input}")
-
-        try:
-            response, action_results = agent.run_step(user_input)
+    outputs = agent.batch_run(demo_conversations)
 
-            if action_results:
-                print("\n[Actions]")
-                for result in action_results:
-                    print(f"   {result}")
-
-            if response:
-                print(f"\n>> Agent: {response}")
+    for user_input, (response, action_results) in zip(demo_conversations, outputs):
+        print(f"\n>> User: {user_input}")
 
-        except Exception as e:
-            print(f"\nError: {e}")
+        if action_results:
+            print("\n[Actions]")
+            for result in action_results:
+                print(f"   {result}")
 
-    print(f"\n\n{'=' * 60}")
-    print("Demo Complete!")
-    print(f"{'=' * 60}")
-    print(f"\nProcessed {len(demo_conversations)} interactions")
-    print(f"Memory contains {len(agent.memory)} saved notes:")
-    for note in agent.memory:
-        print(f"  - {note}")
+        if response:
+            print(f"\n>> Agent: {response}")
 
 
 def custom_agent_example():
@@ -106,5 +177,9 @@ if __name__ == "__main__":
 
     load_dotenv()
 
-    demo_agent()
+    if "--batch" in sys.argv:
+        # Batches trade latency for cost: results can take minutes to arrive
+        batch_demo()
+    else:
+        asyncio.run(demo_agent())
     custom_agent_example()
@@ -3,7 +3,9 @@ Setup Verification Script.
 Checks if your environment is ready to run the agent.
 """
 
+import importlib.metadata
 import importlib.util
+import pathlib
 import sys
 
 
@@ -20,22 +22,24 @@ def check_python_version():
         return False
 
 
-def check_package(package_name):
-    """Check if a package is installed."""
-    spec = importlib.util.find_spec(package_name)
-    if spec is not None:
-        try:
-            module = importlib.import_module(package_name)
-            version = getattr(module, "__version__", "unknown")
-            print(f"[OK] {package_name}: {version}")
-            return True
-        except ImportError:
-            print(f"[FAIL] {package_name}: Import failed")
-            return False
-    else:
+def check_package(package_name, dist_name=None):
+    """
+    Check if a package is installed.
+
+    Reads the version from the installed distribution's metadata instead of
+    importing the package, so heavy dependency trees aren't loaded.
+    """
+    if importlib.util.find_spec(package_name) is None:
         print(f"[FAIL] {package_name}: Not installed")
         return False
 
+    try:
+        version = importlib.metadata.version(dist_name or package_name)
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+    print(f"[OK] {package_name}: {version}")
+    return True
+
 
 def check_env_file():
     """Check if .env file exists and has API key."""
@@ -48,11 +52,9 @@ def check_env_file():
         os.path.join(os.path.dirname(__file__), "..", ".env"),
     ]
 
-    env_path = None
-    for path in possible_paths:
-        if os.path.exists(path):
-            env_path = path
-            break
+    env_path = next(
+        (path for path in map(pathlib.Path, possible_paths) if path.exists()), None
+    )
 
     if env_path:
         print(f"[OK] .env file exists at {env_path}")
@@ -109,7 +111,7 @@ def main():
 
     print("2. Required Packages")
     checks.append(check_package("anthropic"))
-    checks.append(check_package("dotenv"))
+    checks.append(check_package("dotenv", "python-dotenv"))
     print()
 
     print("3. Configuration")
@@ -6,8 +6,19 @@ Two implementations available:
 - AdvancedAgent: Native tool use (production)
 """
 
-from .simple import SimpleAgent
-from .advanced import AdvancedAgent
 from .tools import ToolRegistry, TOOL_SCHEMAS
 
 __all__ = ["SimpleAgent", "AdvancedAgent", "ToolRegistry", "TOOL_SCHEMAS"]
+
+
+def __getattr__(name):
+    """Import the agent classes on first access (PEP 562)."""
+    if name == "SimpleAgent":
+        from .simple import SimpleAgent
+
+        return SimpleAgent
+    if name == "AdvancedAgent":
+        from .advanced import AdvancedAgent
+
+        return AdvancedAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
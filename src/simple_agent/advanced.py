@@ -8,9 +8,78 @@ Benefits over manual parsing:
 - Multi-tool orchestration
 """
 
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 from .base import BaseAgent
 from .tools import TOOL_SCHEMAS
 
+# Shared pool for running independent tool calls from one turn in parallel
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8)
+
+# Anthropic caches the request prefix up to the last cache_control marker,
+# so marking the final schema caches the whole tool list server-side.
+CACHED_TOOL_SCHEMAS = [
+    *TOOL_SCHEMAS[:-1],
+    {**TOOL_SCHEMAS[-1], "cache_control": {"type": "ephemeral"}},
+]
+
+# Tools whose result depends only on their input (and the saved notes)
+CACHEABLE_TOOLS = frozenset({"calculate", "search_memory"})
+
+
+def _tool_call_key(block) -> tuple[str, str]:
+    """Identify a tool call by its name and canonical JSON input."""
+    return block.name, json.dumps(block.input, sort_keys=True)
+
+
+def _unique_tool_calls(blocks: list) -> tuple[list, dict]:
+    """
+    Group a turn's tool_use blocks by call key.
+
+    Returns:
+        Tuple of (key of each block, first block for each distinct key)
+    """
+    keys = [_tool_call_key(block) for block in blocks]
+    unique = {}
+    for key, block in zip(keys, blocks):
+        unique.setdefault(key, block)
+    return keys, unique
+
+
+def _tool_stages(blocks: list) -> list[list]:
+    """
+    Split a turn's tool_use blocks into stages that can run one after another.
+
+    Consecutive side-effect-free calls share a stage and may run
+    concurrently; every other call is a stage of its own.
+    """
+    stages = []
+    for block in blocks:
+        pure = block.name in CACHEABLE_TOOLS
+        if pure and stages and stages[-1][0].name in CACHEABLE_TOOLS:
+            stages[-1].append(block)
+        else:
+            stages.append([block])
+    return stages
+
+
+def _speculative_key(started: dict, streamed: list, block):
+    """
+    Return the call key under which block may start early, or None.
+
+    Records block in streamed, the names of the response's tool_use blocks
+    seen so far.
+    """
+    side_effects_before = any(name not in CACHEABLE_TOOLS for name in streamed)
+    streamed.append(block.name)
+    if side_effects_before or block.name not in CACHEABLE_TOOLS:
+        return None
+    key = _tool_call_key(block)
+    return None if key in started else key
+
 
 class AdvancedAgent(BaseAgent):
     """
@@ -22,10 +91,37 @@ class AdvancedAgent(BaseAgent):
     - Better multi-turn tool interactions
     """
 
+    def __init__(self, *args, stream: bool = False, **kwargs):
+        """
+        Initialize the agent.
+
+        Args:
+            stream: Print Claude's text token-by-token as it is generated
+                    instead of waiting for the complete response.
+            *args, **kwargs: Passed through to BaseAgent
+        """
+        super().__init__(*args, **kwargs)
+        self.stream = stream
+        # Whether the last final response was already printed while streaming
+        self._response_streamed = False
+        # Built once per agent and passed as-is on every request
+        self._tools_payload = tuple(CACHED_TOOL_SCHEMAS)
+        # Per-instance memo of pure tool calls, keyed on canonical JSON input
+        self._cached_tool = lru_cache(maxsize=512)(self._run_cached_tool)
+        # Tool name -> (registry method, name of its string parameter)
+        self._dispatch = {
+            "calculate": (self.tool_registry.calculate, "expression"),
+            "save_note": (self.tool_registry.save_note, "note"),
+            "search_memory": (self.tool_registry.search_memory, "query"),
+        }
+
     def execute_tool(self, tool_name: str, tool_input: dict) -> dict:
         """
         Execute a tool by name with structured input.
 
+        Calls to pure tools are memoized per agent. save_note bypasses the
+        cache and clears it, so later searches see the new note.
+
         Args:
             tool_name: Name of the tool
             tool_input: Dict of input parameters
@@ -33,14 +129,166 @@ class AdvancedAgent(BaseAgent):
         Returns:
             Tool result as dict
         """
-        if tool_name == "calculate":
-            return self.tool_registry.calculate(tool_input["expression"])
-        elif tool_name == "save_note":
-            return self.tool_registry.save_note(tool_input["note"])
-        elif tool_name == "search_memory":
-            return self.tool_registry.search_memory(tool_input["query"])
+        if tool_name in CACHEABLE_TOOLS:
+            return self._cached_tool(tool_name, json.dumps(tool_input, sort_keys=True))
+
+        result = self._dispatch_tool(tool_name, tool_input)
+        if tool_name == "save_note":
+            self._cached_tool.cache_clear()
+        return result
+
+    def _run_cached_tool(self, tool_name: str, input_json: str) -> dict:
+        """Decode a canonical JSON input and dispatch (wrapped by lru_cache)."""
+        return self._dispatch_tool(tool_name, json.loads(input_json))
+
+    def _dispatch_tool(self, tool_name: str, tool_input: dict) -> dict:
+        """Call the ToolRegistry method implementing tool_name."""
+        entry = self._dispatch.get(tool_name)
+        if entry is None:
+            return {"error": f"Unknown tool: {tool_name}"}
+
+        func, param = entry
+        value = tool_input.get(param)
+        if not isinstance(value, str):
+            return {"error": f"Missing or invalid {param!r} parameter"}
+        return func(value)
+
+    async def _aexecute_tool(self, tool_name: str, tool_input: dict) -> dict:
+        """Run execute_tool in a worker thread so it doesn't block the loop."""
+        return await asyncio.to_thread(self.execute_tool, tool_name, tool_input)
+
+    @staticmethod
+    def _tool_use_blocks(response) -> list:
+        """Return the tool_use blocks of a response, printing each request."""
+        blocks = [block for block in response.content if block.type == "tool_use"]
+        for block in blocks:
+            print(f"   -> {block.name}: {block.input}")
+        return blocks
+
+    def _start_tool_future(self, started: dict, streamed: list, block) -> None:
+        """
+        Speculatively run a tool as soon as the stream completes its block.
+
+        Only side-effect-free tools are started early, and only while no
+        earlier block of the response has side effects: a search following
+        a save_note must see the new note. The rest wait until the response
+        is known to end with stop_reason == "tool_use".
+
+        Args:
+            started: Futures of tools started early, by call key
+            streamed: Names of the tool_use blocks streamed so far
+            block: The tool_use block just completed
+        """
+        key = _speculative_key(started, streamed, block)
+        if key is not None:
+            started[key] = _TOOL_POOL.submit(self.execute_tool, block.name, block.input)
+
+    def _start_tool_task(self, started: dict, streamed: list, block) -> None:
+        """Async version of _start_tool_future, starting an asyncio task."""
+        key = _speculative_key(started, streamed, block)
+        if key is not None:
+            started[key] = asyncio.create_task(
+                self._aexecute_tool(block.name, block.input)
+            )
+
+    def _execute_tools(self, blocks: list, started: dict) -> list[dict]:
+        """
+        Execute the tool calls of one turn, overlapping independent calls.
+
+        Calls run in stages (see _tool_stages): each run of consecutive pure
+        calls is dispatched to a thread pool, while a call with side effects
+        such as save_note runs alone once the calls before it are done. The
+        results therefore match running the calls one by one in order, and
+        ToolRegistry is never written while it is being read. Identical
+        calls within a stage run once and share the result, as do repeated
+        side-effecting calls, and calls already started while streaming are
+        reused. Results are returned in the same order as blocks.
+        """
+        results = []
+        side_effects = {}
+        for n, stage in enumerate(_tool_stages(blocks)):
+            if stage[0].name in CACHEABLE_TOOLS:
+                # Only the first stage can have been started while streaming
+                early = started if n == 0 else {}
+                results.extend(self._execute_pure_tools(stage, early))
+                continue
+            (block,) = stage
+            key = _tool_call_key(block)
+            if key not in side_effects:
+                side_effects[key] = self.execute_tool(block.name, block.input)
+            results.append(side_effects[key])
+        return results
+
+    def _execute_pure_tools(self, blocks: list, started: dict) -> list[dict]:
+        """Run side-effect-free tool calls concurrently, one per unique call."""
+        keys, unique = _unique_tool_calls(blocks)
+        if len(unique) == 1 and keys[0] not in started:
+            result = self.execute_tool(blocks[0].name, blocks[0].input)
+            return [result] * len(blocks)
+        futures = {
+            key: started.get(key)
+            or _TOOL_POOL.submit(self.execute_tool, block.name, block.input)
+            for key, block in unique.items()
+        }
+        results = {key: future.result() for key, future in futures.items()}
+        return [results[key] for key in keys]
+
+    async def _aexecute_tools(self, blocks: list, started: dict) -> list[dict]:
+        """Async version of _execute_tools."""
+        results = []
+        side_effects = {}
+        for n, stage in enumerate(_tool_stages(blocks)):
+            if stage[0].name in CACHEABLE_TOOLS:
+                early = started if n == 0 else {}
+                results.extend(await self._aexecute_pure_tools(stage, early))
+                continue
+            (block,) = stage
+            key = _tool_call_key(block)
+            if key not in side_effects:
+                side_effects[key] = await self._aexecute_tool(block.name, block.input)
+            results.append(side_effects[key])
+        return results
+
+    async def _aexecute_pure_tools(self, blocks: list, started: dict) -> list[dict]:
+        """Async version of _execute_pure_tools, gathering one task per call."""
+        keys, unique = _unique_tool_calls(blocks)
+        outputs = await asyncio.gather(
+            *(
+                started.get(key) or self._aexecute_tool(block.name, block.input)
+                for key, block in unique.items()
+            )
+        )
+        results = dict(zip(unique, outputs))
+        return [results[key] for key in keys]
+
+    @staticmethod
+    def _collect_tool_results(
+        blocks: list, results: list[dict], tool_results: list[dict]
+    ) -> list[dict]:
+        """
+        Record executed tools and build the tool_result message content.
 
-        return {"error": f"Unknown tool: {tool_name}"}
+        Args:
+            blocks: The tool_use blocks that were executed
+            results: Tool outputs, in the same order as blocks
+            tool_results: Accumulated results for the caller (extended in place)
+
+        Returns:
+            Content list for the user message carrying the tool results
+        """
+        tool_results_content = []
+        for block, result in zip(blocks, results):
+            tool_results.append(
+                {"tool": block.name, "input": block.input, "output": result}
+            )
+            tool_results_content.append(
+                {
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": str(result),
+                }
+            )
+        return tool_results_content
 
     def run_step(self, user_input: str) -> tuple[str, list[dict]]:
         """
@@ -59,7 +307,9 @@ class AdvancedAgent(BaseAgent):
         """
         print("\n[Observe] Received user input")
 
-        self.conversation_history.append({"role": "user", "content": user_input})
+        # Messages of this turn, committed to history once it completes
+        turn = [{"role": "user", "content": user_input}]
+        self._response_streamed = False
 
         tool_results = []
 
@@ -67,11 +317,18 @@ class AdvancedAgent(BaseAgent):
         while True:
             print("[Think] Querying LLM with tool definitions...")
 
-            response = self.client.messages.create(
+            # Tools started while the response is still streaming, by call key
+            started = {}
+            streamed = []
+            response = self._create_message(
+                stream=self.stream,
+                on_tool_use=lambda block: self._start_tool_future(
+                    started, streamed, block
+                ),
                 model=self.model,
                 max_tokens=1024,
-                tools=TOOL_SCHEMAS,
-                messages=self.conversation_history,
+                tools=self._tools_payload,
+                messages=[*self.conversation_history, *turn],
             )
 
             if response.stop_reason == "end_turn":
@@ -80,57 +337,105 @@ class AdvancedAgent(BaseAgent):
                     (block.text for block in response.content if block.type == "text"),
                     "",
                 )
-                self.conversation_history.append(
-                    {"role": "assistant", "content": response.content}
-                )
-                # Trim history to prevent unbounded growth
-                self._trim_history()
+                turn.append({"role": "assistant", "content": response.content})
+                self._commit_turn(turn)
+                self._response_streamed = self.stream
                 return text_response, tool_results
 
             elif response.stop_reason == "tool_use":
                 # Claude wants to use tools
                 print("[Act] Executing requested tools...")
 
-                self.conversation_history.append(
-                    {"role": "assistant", "content": response.content}
+                turn.append({"role": "assistant", "content": response.content})
+
+                tool_use_blocks = self._tool_use_blocks(response)
+                results = self._execute_tools(tool_use_blocks, started)
+                tool_results_content = self._collect_tool_results(
+                    tool_use_blocks, results, tool_results
                 )
 
-                tool_results_content = []
+                turn.append({"role": "user", "content": tool_results_content})
+                # Loop continues to process tool results
 
-                for block in response.content:
-                    if block.type == "tool_use":
-                        tool_name = block.name
-                        tool_input = block.input
+            else:
+                # Leave history untouched: the turn did not complete
+                return f"Unexpected stop reason: {response.stop_reason}", tool_results
 
-                        print(f"   -> {tool_name}: {tool_input}")
+    async def arun_step(self, user_input: str) -> tuple[str, list[dict]]:
+        """
+        Async version of run_step using the AsyncAnthropic client.
 
-                        result = self.execute_tool(tool_name, tool_input)
-                        tool_results.append(
-                            {"tool": tool_name, "input": tool_input, "output": result}
-                        )
+        The LLM round trips are awaited rather than blocking, so several
+        agents (one per conversation) can be driven concurrently with
+        asyncio.gather.
 
-                        tool_results_content.append(
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": block.id,
-                                "content": str(result),
-                            }
-                        )
+        Args:
+            user_input: The user's message
 
-                self.conversation_history.append(
-                    {"role": "user", "content": tool_results_content}
+        Returns:
+            Tuple of (response_text, tool_results)
+        """
+        print("\n[Observe] Received user input")
+
+        # Messages of this turn, committed to history once it completes
+        turn = [{"role": "user", "content": user_input}]
+        self._response_streamed = False
+
+        tool_results = []
+
+        # Agent loop: continue until we get a text response
+        while True:
+            print("[Think] Querying LLM with tool definitions...")
+
+            started = {}
+            streamed = []
+            response = await self._acreate_message(
+                stream=self.stream,
+                on_tool_use=lambda block: self._start_tool_task(
+                    started, streamed, block
+                ),
+                model=self.model,
+                max_tokens=1024,
+                tools=self._tools_payload,
+                messages=[*self.conversation_history, *turn],
+            )
+
+            if response.stop_reason == "end_turn":
+                text_response = next(
+                    (block.text for block in response.content if block.type == "text"),
+                    "",
                 )
-                # Trim history to prevent unbounded growth during tool loops
-                self._trim_history()
-                # Loop continues to process tool results
+                turn.append({"role": "assistant", "content": response.content})
+                self._commit_turn(turn)
+                self._response_streamed = self.stream
+                return text_response, tool_results
+
+            elif response.stop_reason == "tool_use":
+                print("[Act] Executing requested tools...")
+
+                turn.append({"role": "assistant", "content": response.content})
+
+                tool_use_blocks = self._tool_use_blocks(response)
+                results = await self._aexecute_tools(tool_use_blocks, started)
+                tool_results_content = self._collect_tool_results(
+                    tool_use_blocks, results, tool_results
+                )
+
+                turn.append({"role": "user", "content": tool_results_content})
 
             else:
-                self._trim_history()
+                for task in started.values():
+                    task.cancel()
                 return f"Unexpected stop reason: {response.stop_reason}", tool_results
 
     def _get_banner(self) -> str:
         return "Advanced Agent (Native Tool Use)"
 
+    def _print_response(self, response: str):
+        """Print the final response unless it was already streamed."""
+        if not self._response_streamed:
+            super()._print_response(response)
+
     def _print_action_result(self, result: dict):
         """Print a tool result."""
         print(f"   {result['tool']}: {result['output']}")
@@ -164,8 +469,10 @@ def main():
     compare_approaches()
 
     try:
-        agent = AdvancedAgent()
-        agent.run_interactive()
+        agent = AdvancedAgent(stream=True)
+        asyncio.run(agent.arun_interactive())
+    except KeyboardInterrupt:
+        print("\n\nGoodbye!")
     except ValueError as e:
         print(f"\nError: {e}")
         print("Please set your ANTHROPIC_API_KEY in a .env file")
@@ -2,15 +2,158 @@
 Base agent class with shared functionality.
 """
 
+import asyncio
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
 import os
+import sys
+import threading
+import weakref
 from abc import ABC, abstractmethod
-
-from anthropic import Anthropic
-from dotenv import load_dotenv
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
 from .tools import ToolRegistry
 
-load_dotenv()
+if TYPE_CHECKING:
+    import httpx
+
+# anthropic (and httpx/pydantic beneath it) and dotenv are imported on first
+# agent construction rather than here, so importing the package stays cheap.
+
+# HTTP/2 multiplexing needs the optional h2 package: pip install "httpx[http2]"
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+MAX_CONNECTIONS = 64
+MAX_KEEPALIVE_CONNECTIONS = 32
+
+# 429s and overloaded errors are retried by the SDK with exponential backoff
+MAX_RETRIES = 5
+
+# Most responses kept per agent for reuse; the least recently used go first
+LLM_CACHE_SIZE = 512
+
+# One semaphore per event loop (asyncio primitives are bound to their loop)
+_api_semaphores: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# Connection pools shared by every agent, created on first use. Async
+# connections are bound to the event loop that opened them, so there is one
+# async pool per loop.
+_shared_http_client = None
+_async_http_clients: "weakref.WeakKeyDictionary[Any, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _http_limits() -> "httpx.Limits":
+    """Connection limits for the shared pools."""
+    import httpx
+
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+    )
+
+
+def _get_http_client() -> "httpx.Client":
+    """Return the process-wide HTTP client used by sync Anthropic clients."""
+    global _shared_http_client
+    if _shared_http_client is None:
+        from anthropic import DefaultHttpxClient
+
+        _shared_http_client = DefaultHttpxClient(
+            http2=HTTP2_AVAILABLE, limits=_http_limits()
+        )
+    return _shared_http_client
+
+
+def _get_async_http_client() -> "httpx.AsyncClient":
+    """Return the HTTP client used by async Anthropic clients on the running loop."""
+    loop = asyncio.get_running_loop()
+    http_client = _async_http_clients.get(loop)
+    if http_client is None:
+        from anthropic import DefaultAsyncHttpxClient
+
+        http_client = _async_http_clients[loop] = DefaultAsyncHttpxClient(
+            http2=HTTP2_AVAILABLE, limits=_http_limits()
+        )
+    return http_client
+
+
+def _get_api_semaphore() -> asyncio.Semaphore:
+    """
+    Return the semaphore limiting concurrent API calls on the running loop.
+
+    Its size comes from ANTHROPIC_MAX_CONCURRENCY (default 10, at least 1),
+    read when the semaphore is created so values from .env are picked up.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _api_semaphores.get(loop)
+    if semaphore is None:
+        # A semaphore of 0 would make every call wait forever
+        max_concurrency = max(1, int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", "10")))
+        semaphore = _api_semaphores[loop] = asyncio.Semaphore(max_concurrency)
+    return semaphore
+
+
+async def _ainput(prompt: str) -> str:
+    """
+    Read a line from stdin without blocking the event loop.
+
+    input() runs in a daemon thread so a pending read never keeps the
+    process alive after the loop exits (e.g. on Ctrl+C).
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(outcome, value):
+        if not future.done():
+            getattr(future, outcome)(value)
+
+    def read():
+        try:
+            outcome, value = "set_result", input(prompt)
+        except BaseException as e:
+            outcome, value = "set_exception", e
+        try:
+            loop.call_soon_threadsafe(deliver, outcome, value)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize SDK content blocks stored in history when hashing requests."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return str(obj)
+
+
+def _handle_stream_event(
+    event: Any, on_tool_use: Optional[Callable[[Any], None]]
+) -> None:
+    """Print streamed text and report each tool_use block once it is complete."""
+    if event.type == "text":
+        print(event.text, end="", flush=True)
+    elif (
+        event.type == "content_block_stop"
+        and event.content_block.type == "tool_use"
+        and on_tool_use is not None
+    ):
+        on_tool_use(event.content_block)
+
+
+def _print_text_blocks(response: Any) -> None:
+    """Print the text of a response that was not streamed (e.g. cached)."""
+    for block in response.content:
+        if block.type == "text":
+            print(block.text)
 
 
 class BaseAgent(ABC):
@@ -18,13 +161,21 @@ class BaseAgent(ABC):
     Abstract base class for conversational agents.
 
     Provides:
-    - Anthropic client initialization
+    - Anthropic client initialization (sync and async)
     - Conversation history management
+    - Response cache for repeated identical requests
     - Tool registry
     - Interactive run loop
     """
 
-    def __init__(self, model: str = "claude-sonnet-4-20250514", max_history_length: int = 50):
+    _env_loaded = False  # .env is loaded once, by the first agent created
+
+    def __init__(
+        self,
+        model: str = "claude-sonnet-4-20250514",
+        max_history_length: int = 50,
+        enable_cache: bool = True,
+    ):
         """
         Initialize the agent with Anthropic client.
 
@@ -33,19 +184,74 @@ class BaseAgent(ABC):
             max_history_length: Maximum number of messages to keep in history.
                                Uses a sliding window to prevent unbounded growth.
                                Set to 0 for unlimited history (not recommended).
+            enable_cache: Reuse responses for byte-identical requests instead
+                          of calling the API again (the LLM_CACHE_SIZE most
+                          recently used responses are kept).
         """
+        from anthropic import Anthropic
+
+        if not BaseAgent._env_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            BaseAgent._env_loaded = True
+
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
 
-        self.client = Anthropic(api_key=api_key)
+        # All agents share one connection pool, so TLS connections are reused
+        self.client = Anthropic(
+            api_key=api_key,
+            http_client=_get_http_client(),
+            max_retries=MAX_RETRIES,
+        )
+        self._api_key = api_key
+        # Async clients are created per event loop on first use (see aclient)
+        self._aclients: weakref.WeakKeyDictionary[Any, Any] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._aclient_override = None
         self.model = model
         self.max_history_length = max_history_length
-        self.conversation_history: list[dict] = []
+        # Bounded deque: appending past maxlen evicts the oldest message in O(1)
+        self.conversation_history: deque[dict] = deque(
+            maxlen=max_history_length if max_history_length > 0 else None
+        )
         self.tool_registry = ToolRegistry()
+        self.enable_cache = enable_cache
+        self._llm_cache: OrderedDict[str, Any] = OrderedDict()
+
+    @property
+    def aclient(self) -> Any:
+        """
+        AsyncAnthropic client for the running event loop.
+
+        Each loop gets its own client on that loop's shared connection pool,
+        so an agent can be driven by successive asyncio.run() calls without
+        reusing connections opened on a closed loop.
+        """
+        if self._aclient_override is not None:
+            return self._aclient_override
+        loop = asyncio.get_running_loop()
+        aclient = self._aclients.get(loop)
+        if aclient is None:
+            from anthropic import AsyncAnthropic
+
+            aclient = self._aclients[loop] = AsyncAnthropic(
+                api_key=self._api_key,
+                http_client=_get_async_http_client(),
+                max_retries=MAX_RETRIES,
+            )
+        return aclient
+
+    @aclient.setter
+    def aclient(self, aclient: Any) -> None:
+        """Use aclient on every loop (e.g. a custom or fake client)."""
+        self._aclient_override = aclient
 
     @property
-    def memory(self) -> list[str]:
+    def memory(self) -> deque[str]:
         """Access to tool registry memory."""
         return self.tool_registry.memory
 
@@ -53,28 +259,116 @@ class BaseAgent(ABC):
         """Clear conversation history for manual control."""
         self.conversation_history.clear()
 
-    def _trim_history(self) -> None:
+    def _cache_key(self, params: dict) -> str:
+        """Hash the request parameters (model, messages, tools, ...)."""
+        payload = json.dumps(params, sort_keys=True, default=_json_default)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _cached_response(self, key: Optional[str]) -> Any:
+        """Return the cached response for key (marking it recently used), or None."""
+        response = self._llm_cache.get(key)
+        if response is not None:
+            self._llm_cache.move_to_end(key)
+        return response
+
+    def _cache_response(self, key: str, response: Any) -> None:
+        """Cache a response, evicting the least recently used past LLM_CACHE_SIZE."""
+        self._llm_cache[key] = response
+        if len(self._llm_cache) > LLM_CACHE_SIZE:
+            self._llm_cache.popitem(last=False)
+
+    def _create_message(
+        self,
+        stream: bool = False,
+        on_tool_use: Optional[Callable[[Any], None]] = None,
+        **params,
+    ) -> Any:
+        """
+        Call messages.create, reusing the cached response for identical requests.
+
+        Args:
+            stream: Stream the response, printing text as it is generated
+            on_tool_use: Called with each tool_use block as soon as the stream
+                         completes it, before the rest of the response arrives
+            **params: Keyword arguments for client.messages.create
+
+        Returns:
+            The API response message
+        """
+        key = self._cache_key(params) if self.enable_cache else None
+        response = self._cached_response(key)
+        if response is not None:
+            if stream:
+                _print_text_blocks(response)
+            return response
+
+        if stream:
+            with self.client.messages.stream(**params) as message_stream:
+                for event in message_stream:
+                    _handle_stream_event(event, on_tool_use)
+                response = message_stream.get_final_message()
+            print()
+        else:
+            response = self.client.messages.create(**params)
+
+        if key is not None:
+            self._cache_response(key, response)
+        return response
+
+    async def _acreate_message(
+        self,
+        stream: bool = False,
+        on_tool_use: Optional[Callable[[Any], None]] = None,
+        **params,
+    ) -> Any:
         """
-        Trim conversation history to max_history_length using a sliding window.
+        Async version of _create_message using the AsyncAnthropic client.
 
-        Keeps the most recent messages while preserving conversation coherence.
-        Always starts with a user message to maintain valid message structure.
+        At most ANTHROPIC_MAX_CONCURRENCY calls are in flight at once across
+        all agents, so concurrent sessions don't trip the API's rate limits.
         """
-        if self.max_history_length <= 0:
-            return  # Unlimited history
+        key = self._cache_key(params) if self.enable_cache else None
+        response = self._cached_response(key)
+        if response is not None:
+            if stream:
+                _print_text_blocks(response)
+            return response
 
-        if len(self.conversation_history) <= self.max_history_length:
-            return  # No trimming needed
+        async with _get_api_semaphore():
+            if stream:
+                async with self.aclient.messages.stream(**params) as message_stream:
+                    async for event in message_stream:
+                        _handle_stream_event(event, on_tool_use)
+                    response = await message_stream.get_final_message()
+                print()
+            else:
+                response = await self.aclient.messages.create(**params)
 
-        # Calculate how many messages to remove
-        excess = len(self.conversation_history) - self.max_history_length
+        if key is not None:
+            self._cache_response(key, response)
+        return response
+
+    def _trim_history(self) -> None:
+        """
+        Keep the sliding window of history valid after appending messages.
 
-        # Trim from the beginning, but ensure we start with a user message
-        self.conversation_history = self.conversation_history[excess:]
+        The deque's maxlen already evicts the oldest messages, so this only
+        drops leading non-user messages: the history must start with a user
+        message to maintain valid message structure.
+        """
+        history = self.conversation_history
+        while history and history[0]["role"] != "user":
+            history.popleft()
 
-        # Ensure history starts with a user message for valid API structure
-        while self.conversation_history and self.conversation_history[0]["role"] != "user":
-            self.conversation_history.pop(0)
+    def _commit_turn(self, messages: list[dict]) -> None:
+        """
+        Append a completed turn's messages to history and trim it.
+
+        Turns are built outside the history and only committed once the LLM
+        has answered, so a failed request leaves no dangling user message.
+        """
+        self.conversation_history.extend(messages)
+        self._trim_history()
 
     @abstractmethod
     def run_step(self, user_input: str) -> tuple[str, list]:
@@ -89,13 +383,24 @@ class BaseAgent(ABC):
         """
         pass
 
+    async def arun_step(self, user_input: str) -> tuple[str, list]:
+        """
+        Async version of run_step.
+
+        Runs run_step in a worker thread; subclasses with a native async
+        agent loop override this.
+
+        Args:
+            user_input: The user's message
+
+        Returns:
+            Tuple of (response_text, action_results)
+        """
+        return await asyncio.to_thread(self.run_step, user_input)
+
     def run_interactive(self):
         """Run the agent in interactive mode."""
-        print("=" * 60)
-        print(self._get_banner())
-        print("=" * 60)
-        print("Type 'quit' or 'exit' to end the conversation")
-        print("Try: 'Calculate 15 * 7' or 'Remember to buy milk'\n")
+        self._print_intro()
 
         while True:
             try:
@@ -109,25 +414,79 @@ class BaseAgent(ABC):
                     continue
 
                 response, action_results = self.run_step(user_input)
+                self._print_turn(response, action_results)
 
-                if action_results:
-                    print("\n[Actions]")
-                    for result in action_results:
-                        self._print_action_result(result)
+            except KeyboardInterrupt:
+                print("\n\nGoodbye!")
+                break
+            except Exception as e:
+                print(f"\nError: {e}")
 
-                if response:
-                    print(f"\n>> Agent: {response}")
+    async def arun_interactive(self):
+        """
+        Run the agent in interactive mode on the asyncio event loop.
 
-            except KeyboardInterrupt:
+        Waiting for input doesn't block the loop, so background tasks keep
+        running while the user types.
+        """
+        self._print_intro()
+
+        while True:
+            try:
+                user_input = (await _ainput("\n>> You: ")).strip()
+
+                if user_input.lower() in ["quit", "exit", "q"]:
+                    print("\nGoodbye!")
+                    break
+
+                if not user_input:
+                    continue
+
+                response, action_results = await self.arun_step(user_input)
+                self._print_turn(response, action_results)
+
+            except (KeyboardInterrupt, EOFError):
                 print("\n\nGoodbye!")
                 break
             except Exception as e:
                 print(f"\nError: {e}")
 
+    def _print_intro(self):
+        """Print the banner and usage hints for interactive mode."""
+        print("=" * 60)
+        print(self._get_banner())
+        print("=" * 60)
+        print("Type 'quit' or 'exit' to end the conversation")
+        print("Try: 'Calculate 15 * 7' or 'Remember to buy milk'\n")
+
+    def _print_turn(self, response: str, action_results: list):
+        """
+        Print the actions and response of one interactive turn.
+
+        Output is collected in a buffer and written with a single write and
+        flush, instead of one write per printed line.
+        """
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            if action_results:
+                print("\n[Actions]")
+                for result in action_results:
+                    self._print_action_result(result)
+
+            if response:
+                self._print_response(response)
+
+        sys.stdout.write(buffer.getvalue())
+        sys.stdout.flush()
+
     def _get_banner(self) -> str:
         """Get the banner text for interactive mode."""
         return "Conversational Agent"
 
+    def _print_response(self, response: str):
+        """Print the agent's final response."""
+        print(f"\n>> Agent: {response}")
+
     def _print_action_result(self, result):
         """Print a single action result."""
         print(f"   {result}")
@@ -3,8 +3,63 @@ Simple Conversational Agent with manual action parsing.
 Demonstrates the basic agent loop: Observe -> Think -> Act
 """
 
+import asyncio
+import re
+import time
+from typing import Optional
+
 from .base import BaseAgent
 
+_SYSTEM_PROMPT = """You are a helpful AI assistant with the ability to perform actions.
+
+You have access to the following tools:
+- calculate: Perform mathematical calculations (e.g., "calculate: 5 + 3 * 2")
+- search_memory: Search through saved notes (e.g., "search_memory: keyword")
+- save_note: Save information for later (e.g., "save_note: Important meeting at 3pm")
+
+When you want to use a tool, format your response like this:
+ACTION: tool_name: parameter
+
+You can also respond conversationally without using any tools.
+
+Be helpful, concise, and friendly. If a user asks you to remember something,
+use save_note. If they ask about something you saved, use search_memory."""
+
+# A line starting with "ACTION:", capturing the rest of the line ([^\S\n] is
+# whitespace other than a newline). Splitting that into tool name and
+# parameter is left to _split_action: a regex that also trims the parts would
+# backtrack quadratically on long runs of spaces.
+_ACTION_RE = re.compile(r"^[^\S\n]*ACTION:(.*)$", re.MULTILINE)
+# The same line including its newline, for removing it from the displayed text
+_ACTION_LINE_RE = re.compile(r"^[^\S\n]*ACTION:(.*)\n?", re.MULTILINE)
+
+# Anthropic caches the request prefix up to each cache_control marker (the
+# minimum cacheable length depends on the model)
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _cache_last_turn(messages: list[dict]) -> list[dict]:
+    """
+    Mark the final message with a cache breakpoint.
+
+    The next turn then reads the conversation so far from the prompt cache
+    instead of reprocessing it. Only the request copy is changed; the
+    conversation history keeps plain string content.
+    """
+    if not messages or not isinstance(messages[-1]["content"], str):
+        return messages
+    last = messages[-1]
+    block = {"type": "text", "text": last["content"], "cache_control": _CACHE_CONTROL}
+    return [*messages[:-1], {"role": last["role"], "content": [block]}]
+
+
+def _split_action(action_part: str) -> Optional[tuple[str, str]]:
+    """Split the text after "ACTION:" into (tool_name, parameter), if it has both."""
+    tool_name, colon, parameter = action_part.partition(":")
+    if not colon:
+        return None
+    return tool_name.strip(), parameter.strip()
+
 
 class SimpleAgent(BaseAgent):
     """
@@ -23,20 +78,17 @@ class SimpleAgent(BaseAgent):
         The LLM is instructed to output actions in a specific format
         that we can parse: ACTION: tool_name: parameter
         """
-        return """You are a helpful AI assistant with the ability to perform actions.
-
-You have access to the following tools:
-- calculate: Perform mathematical calculations (e.g., "calculate: 5 + 3 * 2")
-- search_memory: Search through saved notes (e.g., "search_memory: keyword")
-- save_note: Save information for later (e.g., "save_note: Important meeting at 3pm")
-
-When you want to use a tool, format your response like this:
-ACTION: tool_name: parameter
-
-You can also respond conversationally without using any tools.
-
-Be helpful, concise, and friendly. If a user asks you to remember something,
-use save_note. If they ask about something you saved, use search_memory."""
+        return _SYSTEM_PROMPT
+
+    def _system_blocks(self) -> list[dict]:
+        """System prompt as a text block marked for prompt caching."""
+        return [
+            {
+                "type": "text",
+                "text": self.get_system_prompt(),
+                "cache_control": _CACHE_CONTROL,
+            }
+        ]
 
     def parse_actions(self, response_text: str) -> list[tuple[str, str]]:
         """
@@ -50,16 +102,35 @@ use save_note. If they ask about something you saved, use search_memory."""
         Returns:
             List of (tool_name, parameter) tuples
         """
-        actions = []
-
-        for line in response_text.split("\n"):
-            if line.strip().startswith("ACTION:"):
-                action_part = line.strip()[7:].strip()  # Remove 'ACTION:'
-                if ":" in action_part:
-                    tool_name, parameter = action_part.split(":", 1)
-                    actions.append((tool_name.strip(), parameter.strip()))
-
-        return actions
+        matches = _ACTION_RE.finditer(response_text)
+        return list(filter(None, (_split_action(match.group(1)) for match in matches)))
+
+    def _do_calc(self, parameter: str) -> str:
+        """Run the calculate tool."""
+        result = self.tool_registry.calculate(parameter)
+        if "error" in result:
+            return f"Error: {result['error']}"
+        return f"Result: {result['result']}"
+
+    def _do_save(self, parameter: str) -> str:
+        """Run the save_note tool."""
+        self.tool_registry.save_note(parameter)
+        return f"Saved note: {parameter}"
+
+    def _do_search(self, parameter: str) -> str:
+        """Run the search_memory tool."""
+        bullets = self.tool_registry.search_memory_bullets(parameter)
+        if bullets:
+            return "Found notes:\n" + "\n".join(bullets)
+        return "No matching notes found."
+
+    # Tool name -> name of the method returning the formatted result, looked
+    # up on the instance so subclasses can override individual handlers
+    _DISPATCH = {
+        "calculate": "_do_calc",
+        "save_note": "_do_save",
+        "search_memory": "_do_search",
+    }
 
     def execute_action(self, tool_name: str, parameter: str) -> str:
         """
@@ -72,23 +143,10 @@ use save_note. If they ask about something you saved, use search_memory."""
         Returns:
             Result string
         """
-        if tool_name == "calculate":
-            result = self.tool_registry.calculate(parameter)
-            if "error" in result:
-                return f"Error: {result['error']}"
-            return f"Result: {result['result']}"
-
-        elif tool_name == "save_note":
-            result = self.tool_registry.save_note(parameter)
-            return f"Saved note: {parameter}"
-
-        elif tool_name == "search_memory":
-            result = self.tool_registry.search_memory(parameter)
-            if result["count"] > 0:
-                return "Found notes:\n" + "\n".join(f"- {n}" for n in result["results"])
-            return "No matching notes found."
-
-        return f"Error: Unknown tool '{tool_name}'"
+        handler_name = self._DISPATCH.get(tool_name)
+        if handler_name is None:
+            return f"Error: Unknown tool '{tool_name}'"
+        return getattr(self, handler_name)(parameter)
 
     def think(self, user_input: str) -> str:
         """
@@ -100,24 +158,22 @@ use save_note. If they ask about something you saved, use search_memory."""
         Returns:
             The LLM's response text
         """
-        self.conversation_history.append({"role": "user", "content": user_input})
+        user_message = {"role": "user", "content": user_input}
 
-        response = self.client.messages.create(
+        response = self._create_message(
             model=self.model,
             max_tokens=1024,
-            system=self.get_system_prompt(),
-            messages=self.conversation_history,
+            system=self._system_blocks(),
+            messages=_cache_last_turn([*self.conversation_history, user_message]),
         )
 
         response_text = response.content[0].text
 
-        self.conversation_history.append(
-            {"role": "assistant", "content": response_text}
+        # Record the exchange only now that the request has succeeded
+        self._commit_turn(
+            [user_message, {"role": "assistant", "content": response_text}]
         )
 
-        # Trim history to prevent unbounded growth
-        self._trim_history()
-
         return response_text
 
     def act(self, response_text: str) -> tuple[str, list[str]]:
@@ -130,22 +186,43 @@ use save_note. If they ask about something you saved, use search_memory."""
         Returns:
             Tuple of (display_text, action_results)
         """
-        actions = self.parse_actions(response_text)
+        # Conversational replies (the common case) have nothing to parse
+        if "ACTION:" not in response_text:
+            return response_text.strip(), []
+
+        actions, display_text = self._parse_and_strip(response_text)
         action_results = []
 
         for tool_name, parameter in actions:
             result = self.execute_action(tool_name, parameter)
             action_results.append(result)
 
-        # Remove ACTION: lines from display
-        display_text = "\n".join(
-            line
-            for line in response_text.split("\n")
-            if not line.strip().startswith("ACTION:")
-        ).strip()
-
         return display_text, action_results
 
+    def _parse_and_strip(self, response_text: str) -> tuple[list[tuple[str, str]], str]:
+        """
+        Extract actions and remove ACTION: lines in a single pass.
+
+        Equivalent to parse_actions() plus stripping the ACTION: lines from
+        the display text, but walks the response only once.
+
+        Args:
+            response_text: The LLM's response
+
+        Returns:
+            Tuple of (actions, display_text)
+        """
+        actions = []
+
+        def take_action(match: re.Match) -> str:
+            action = _split_action(match.group(1))
+            if action is not None:
+                actions.append(action)
+            return ""
+
+        display_text = _ACTION_LINE_RE.sub(take_action, response_text).strip()
+        return actions, display_text
+
     def run_step(self, user_input: str) -> tuple[str, list[str]]:
         """
         The basic agent loop: Observe -> Think -> Act
@@ -169,6 +246,113 @@ use save_note. If they ask about something you saved, use search_memory."""
 
         return display_text, action_results
 
+    def batch_run(
+        self,
+        prompts: list[str],
+        poll_interval: float = 1.0,
+        max_poll_interval: float = 60.0,
+    ) -> list[tuple[str, list[str]]]:
+        """
+        Process independent prompts through the Message Batches API.
+
+        Each prompt is sent as a single-turn request (no conversation
+        history), which halves the cost compared to individual calls.
+        Actions are executed in prompt order once all results are in,
+        so notes saved by earlier prompts are visible to later searches.
+
+        Args:
+            prompts: User messages to process
+            poll_interval: Initial delay between status checks in seconds
+            max_poll_interval: Upper bound for the exponential backoff
+
+        Returns:
+            List of (response_text, action_results), one per prompt
+        """
+        print(f"\n[Think] Submitting batch of {len(prompts)} requests...")
+
+        # Shared by every request, so later ones can hit the prompt cache
+        system = self._system_blocks()
+
+        batch = self.client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": f"turn-{i}",
+                    "params": {
+                        "model": self.model,
+                        "max_tokens": 1024,
+                        "system": system,
+                        "messages": [{"role": "user", "content": prompt}],
+                    },
+                }
+                for i, prompt in enumerate(prompts)
+            ]
+        )
+
+        delay = poll_interval
+        while batch.processing_status != "ended":
+            time.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+            batch = self.client.messages.batches.retrieve(batch.id)
+
+        responses = {}
+        for entry in self.client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                responses[entry.custom_id] = entry.result.message.content[0].text
+            else:
+                responses[entry.custom_id] = None
+
+        print("[Act] Parsing and executing actions...")
+        outputs = []
+        for i in range(len(prompts)):
+            response_text = responses.get(f"turn-{i}")
+            if response_text is None:
+                outputs.append(("Error: batch request did not succeed", []))
+            else:
+                outputs.append(self.act(response_text))
+
+        return outputs
+
+    async def abatch_run(self, prompts: list[str]) -> list[tuple[str, list[str]]]:
+        """
+        Process independent prompts as concurrent single-turn requests.
+
+        The low-latency counterpart to batch_run: results arrive as soon as
+        the slowest request finishes instead of when the batch is processed,
+        at regular (non-batch) pricing. In-flight requests are capped by
+        ANTHROPIC_MAX_CONCURRENCY. Actions are executed in prompt order.
+
+        Args:
+            prompts: User messages to process
+
+        Returns:
+            List of (response_text, action_results), one per prompt
+        """
+        print(f"\n[Think] Sending {len(prompts)} concurrent requests...")
+
+        system = self._system_blocks()
+        responses = await asyncio.gather(
+            *(
+                self._acreate_message(
+                    model=self.model,
+                    max_tokens=1024,
+                    system=system,
+                    messages=[{"role": "user", "content": prompt}],
+                )
+                for prompt in prompts
+            ),
+            return_exceptions=True,
+        )
+
+        print("[Act] Parsing and executing actions...")
+        outputs = []
+        for response in responses:
+            if isinstance(response, BaseException):
+                outputs.append((f"Error: {response}", []))
+            else:
+                outputs.append(self.act(response.content[0].text))
+
+        return outputs
+
     def _get_banner(self) -> str:
         return "Simple Agent (Manual Parsing)"
 
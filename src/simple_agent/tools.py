@@ -4,8 +4,17 @@ Reusable tools for the conversational agents.
 
 import ast
 import operator
+import re
+from collections import defaultdict, deque
+from functools import lru_cache
 from typing import Union
 
+# Words as indexed for search_memory
+_WORD_RE = re.compile(r"\w+")
+
+# Most notes kept in memory; saving beyond this drops the oldest note
+MAX_NOTES = 10_000
+
 
 class SafeExpressionEvaluator:
     """
@@ -25,10 +34,17 @@ class SafeExpressionEvaluator:
 
     MAX_POWER = 1000  # Prevent excessive computation
 
+    def __init__(self):
+        # Expressions are pure arithmetic, so results can be memoized
+        self._evaluate_cached = lru_cache(maxsize=512)(self._evaluate_normalized)
+
     def evaluate(self, expression: str) -> Union[int, float]:
         """
         Safely evaluate a mathematical expression.
 
+        Results are cached by normalized expression, so repeated calculations
+        skip parsing and evaluation.
+
         Args:
             expression: Mathematical expression string
 
@@ -42,8 +58,10 @@ class SafeExpressionEvaluator:
             raise ValueError("Empty expression")
 
         # Replace ^ with ** for exponentiation
-        expression = expression.replace("^", "**")
+        return self._evaluate_cached(expression.replace("^", "**").strip())
 
+    def _evaluate_normalized(self, expression: str) -> Union[int, float]:
+        """Parse and evaluate an expression already normalized by evaluate()."""
         try:
             tree = ast.parse(expression, mode="eval")
         except SyntaxError as e:
@@ -90,8 +108,16 @@ class ToolRegistry:
     """Registry of available tools with their implementations."""
 
     def __init__(self):
-        self.memory: list[str] = []
+        self.memory: deque[str] = deque(maxlen=MAX_NOTES)
         self._evaluator = SafeExpressionEvaluator()
+        # Lowercased copy of each note, so searches don't re-lowercase them
+        self._memory_lc: deque[str] = deque(maxlen=MAX_NOTES)
+        # "- note" form of each note, as listed in search results
+        self._memory_bullets: deque[str] = deque(maxlen=MAX_NOTES)
+        # Inverted index: word -> ids of notes containing it. Ids increase with
+        # every save, so the oldest note in memory has id _next_id - len(memory)
+        self._index: defaultdict[str, set[int]] = defaultdict(set)
+        self._next_id = 0
 
     def calculate(self, expression: str) -> dict:
         """
@@ -117,18 +143,42 @@ class ToolRegistry:
         """
         Save a note to memory.
 
+        Once MAX_NOTES notes are saved, the oldest one is dropped.
+
         Args:
             note: The note to save
 
         Returns:
             Dict with status and message
         """
+        if len(self.memory) == self.memory.maxlen:
+            self._unindex_oldest()
+        note_id = self._next_id
+        self._next_id += 1
+        note_lc = note.lower()
         self.memory.append(note)
+        self._memory_lc.append(note_lc)
+        self._memory_bullets.append(f"- {note}")
+        for word in _WORD_RE.findall(note_lc):
+            self._index[word].add(note_id)
         return {"status": "success", "message": f"Saved: {note}"}
 
+    def _unindex_oldest(self) -> None:
+        """Remove the oldest note's postings before the deque evicts it."""
+        oldest_id = self._next_id - len(self.memory)
+        for word in set(_WORD_RE.findall(self._memory_lc[0])):
+            ids = self._index[word]
+            ids.discard(oldest_id)
+            if not ids:
+                del self._index[word]
+
     def search_memory(self, query: str) -> dict:
         """
-        Search through saved notes.
+        Search through saved notes (case-insensitive substring match).
+
+        A single-word query can only occur inside one word of a note, so it
+        is answered from the inverted index by scanning the vocabulary rather
+        than every note. Other queries scan the lowercased notes.
 
         Args:
             query: Keyword to search for
@@ -136,9 +186,38 @@ class ToolRegistry:
         Returns:
             Dict with results and count
         """
-        results = [note for note in self.memory if query.lower() in note.lower()]
+        results = [self.memory[pos] for pos in self._search_positions(query)]
         return {"results": results, "count": len(results)}
 
+    def search_memory_bullets(self, query: str) -> list[str]:
+        """
+        Search like search_memory, returning matches as "- note" lines.
+
+        The bulleted form of each note is built once when it is saved, so
+        listing matches needs no per-search formatting.
+
+        Args:
+            query: Keyword to search for
+
+        Returns:
+            Matching notes in save order, each prefixed with "- "
+        """
+        return [self._memory_bullets[pos] for pos in self._search_positions(query)]
+
+    def _search_positions(self, query: str) -> list[int]:
+        """Positions in memory of the notes matching query, in save order."""
+        query_lc = query.lower()
+        if _WORD_RE.fullmatch(query_lc):
+            note_ids = set()
+            for word, ids in self._index.items():
+                if query_lc in word:
+                    note_ids |= ids
+            first_id = self._next_id - len(self.memory)
+            return [i - first_id for i in sorted(note_ids)]
+        return [
+            pos for pos, note_lc in enumerate(self._memory_lc) if query_lc in note_lc
+        ]
+
 
 # Tool schemas for Anthropic's native tool use
 TOOL_SCHEMAS = [
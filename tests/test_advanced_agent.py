@@ -0,0 +1,523 @@
+"""Tests for AdvancedAgent tool dispatch and agent loop using fake clients."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from simple_agent import base
+from simple_agent.advanced import AdvancedAgent
+
+
+def text_block(text):
+    return SimpleNamespace(type="text", text=text)
+
+
+def tool_block(block_id, name, tool_input):
+    return SimpleNamespace(type="tool_use", id=block_id, name=name, input=tool_input)
+
+
+def message(stop_reason, *content):
+    return SimpleNamespace(stop_reason=stop_reason, content=list(content))
+
+
+class FakeMessages:
+    """Returns canned responses in order and records each request."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def create(self, **params):
+        self.calls.append({**params, "messages": list(params["messages"])})
+        return self.responses.pop(0)
+
+    def stream(self, **params):
+        return FakeStream(self.create(**params))
+
+
+class FakeAsyncMessages(FakeMessages):
+    async def create(self, **params):
+        return FakeMessages.create(self, **params)
+
+    def stream(self, **params):
+        return FakeAsyncStream(FakeMessages.create(self, **params))
+
+
+def stream_events(final_message):
+    """Events a message stream yields: text chunks and completed blocks."""
+    events = []
+    for block in final_message.content:
+        if block.type == "text":
+            events.append(SimpleNamespace(type="text", text=block.text))
+        events.append(SimpleNamespace(type="content_block_stop", content_block=block))
+    return events
+
+
+class FakeStream:
+    """Stream context manager yielding a message's events."""
+
+    def __init__(self, final_message):
+        self.final_message = final_message
+        self.events = stream_events(final_message)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def get_final_message(self):
+        return self.final_message
+
+
+class FakeAsyncStream(FakeStream):
+    """Async stream context manager yielding a message's events."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for event in self.events:
+            yield event
+
+    async def get_final_message(self):
+        return self.final_message
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """Create an AdvancedAgent without a real API key."""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    return AdvancedAgent()
+
+
+@pytest.fixture
+def streaming_agent(monkeypatch):
+    """Create an AdvancedAgent that streams its responses."""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    return AdvancedAgent(stream=True)
+
+
+TOOL_ROUND = [
+    message(
+        "tool_use",
+        tool_block("t1", "calculate", {"expression": "6 * 7"}),
+        tool_block("t2", "save_note", {"note": "Buy milk"}),
+    ),
+    message("end_turn", text_block("Done.")),
+]
+
+
+class TestExecuteTool:
+    """Tests for AdvancedAgent.execute_tool."""
+
+    def test_calculate(self, agent):
+        assert agent.execute_tool("calculate", {"expression": "2 + 3"}) == {"result": 5}
+
+    def test_save_and_search(self, agent):
+        agent.execute_tool("save_note", {"note": "Dentist on Friday"})
+        result = agent.execute_tool("search_memory", {"query": "dentist"})
+        assert result["count"] == 1
+
+    def test_unknown_tool(self, agent):
+        result = agent.execute_tool("unknown_tool", {})
+        assert "Unknown tool" in result["error"]
+
+    def test_missing_parameter(self, agent):
+        result = agent.execute_tool("save_note", {"text": "Buy milk"})
+        assert "'note'" in result["error"]
+        assert len(agent.memory) == 0
+
+    def test_non_string_parameter(self, agent):
+        result = agent.execute_tool("calculate", {"expression": 42})
+        assert "'expression'" in result["error"]
+
+    def test_repeated_calculate_is_cached(self, agent):
+        agent.execute_tool("calculate", {"expression": "2 ^ 10"})
+        result = agent.execute_tool("calculate", {"expression": "2 ^ 10"})
+        assert result == {"result": 1024}
+        assert agent._cached_tool.cache_info().hits == 1
+
+    def test_save_note_invalidates_cached_search(self, agent):
+        assert agent.execute_tool("search_memory", {"query": "milk"})["count"] == 0
+        agent.execute_tool("save_note", {"note": "Buy milk"})
+        assert agent.execute_tool("search_memory", {"query": "milk"})["count"] == 1
+
+
+class TestRunStep:
+    """Tests for the tool-use loop."""
+
+    def test_run_step_executes_tools(self, agent):
+        agent.client = SimpleNamespace(messages=FakeMessages(TOOL_ROUND))
+
+        response, tool_results = agent.run_step("Compute and remember")
+
+        assert response == "Done."
+        assert [r["tool"] for r in tool_results] == ["calculate", "save_note"]
+        assert tool_results[0]["output"] == {"result": 42}
+        assert "Buy milk" in agent.memory
+
+    def test_arun_step_executes_tools(self, agent):
+        agent.aclient = SimpleNamespace(messages=FakeAsyncMessages(TOOL_ROUND))
+
+        response, tool_results = asyncio.run(agent.arun_step("Compute and remember"))
+
+        assert response == "Done."
+        assert [r["tool"] for r in tool_results] == ["calculate", "save_note"]
+        assert "Buy milk" in agent.memory
+
+    def test_tool_results_follow_tool_use_order(self, agent):
+        fake = FakeMessages(TOOL_ROUND)
+        agent.client = SimpleNamespace(messages=fake)
+
+        agent.run_step("Compute and remember")
+
+        tool_results_message = fake.calls[1]["messages"][-1]
+        assert tool_results_message["role"] == "user"
+        ids = [item["tool_use_id"] for item in tool_results_message["content"]]
+        assert ids == ["t1", "t2"]
+
+    def test_arun_step_tool_results_follow_tool_use_order(self, agent):
+        fake = FakeAsyncMessages(TOOL_ROUND)
+        agent.aclient = SimpleNamespace(messages=fake)
+
+        asyncio.run(agent.arun_step("Compute and remember"))
+
+        tool_results_message = fake.calls[1]["messages"][-1]
+        ids = [item["tool_use_id"] for item in tool_results_message["content"]]
+        assert ids == ["t1", "t2"]
+
+    def test_completed_turn_is_committed_to_history(self, agent):
+        agent.client = SimpleNamespace(messages=FakeMessages(TOOL_ROUND))
+
+        agent.run_step("Compute and remember")
+
+        roles = [m["role"] for m in agent.conversation_history]
+        assert roles == ["user", "assistant", "user", "assistant"]
+
+    def test_failed_request_leaves_history_untouched(self, agent):
+        # No canned responses left, so the second request raises
+        agent.client = SimpleNamespace(messages=FakeMessages(TOOL_ROUND[:1]))
+
+        with pytest.raises(IndexError):
+            agent.run_step("Compute and remember")
+
+        assert len(agent.conversation_history) == 0
+
+    def test_unexpected_stop_reason_leaves_history_untouched(self, agent):
+        fake = FakeAsyncMessages([message("max_tokens", text_block("Cut off"))])
+        agent.aclient = SimpleNamespace(messages=fake)
+
+        response, _ = asyncio.run(agent.arun_step("Hello"))
+
+        assert response == "Unexpected stop reason: max_tokens"
+        assert len(agent.conversation_history) == 0
+
+
+class TestResponseCache:
+    """Tests for reusing responses to identical requests."""
+
+    def test_identical_request_is_served_from_cache(self, agent):
+        fake = FakeMessages([message("end_turn", text_block("Hi!"))])
+        agent.client = SimpleNamespace(messages=fake)
+
+        first, _ = agent.run_step("Hello")
+        agent.clear_history()
+        second, _ = agent.run_step("Hello")
+
+        assert first == second == "Hi!"
+        assert len(fake.calls) == 1
+
+    def test_cache_can_be_disabled(self, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        agent = AdvancedAgent(enable_cache=False)
+        fake = FakeMessages([message("end_turn", text_block("Hi!"))] * 2)
+        agent.client = SimpleNamespace(messages=fake)
+
+        agent.run_step("Hello")
+        agent.clear_history()
+        agent.run_step("Hello")
+
+        assert len(fake.calls) == 2
+
+    def test_cache_evicts_least_recently_used(self, agent, monkeypatch):
+        monkeypatch.setattr(base, "LLM_CACHE_SIZE", 2)
+        fake = FakeMessages([message("end_turn", text_block("Hi!"))] * 5)
+        agent.client = SimpleNamespace(messages=fake)
+
+        for prompt in ["a", "b", "a", "c", "a", "b"]:
+            agent.run_step(prompt)
+            agent.clear_history()
+
+        # "a" stays cached while in use; "b" is evicted by "c" and re-sent
+        assert [call["messages"][0]["content"] for call in fake.calls] == [
+            "a",
+            "b",
+            "c",
+            "b",
+        ]
+        assert len(agent._llm_cache) == 2
+
+
+class TestPromptCaching:
+    """Tests for the cache_control marker on tool definitions."""
+
+    def test_only_last_tool_schema_is_marked(self, agent):
+        fake = FakeMessages([message("end_turn", text_block("Hi!"))])
+        agent.client = SimpleNamespace(messages=fake)
+
+        agent.run_step("Hello")
+
+        tools = fake.calls[0]["tools"]
+        assert tools[-1]["cache_control"] == {"type": "ephemeral"}
+        assert all("cache_control" not in tool for tool in tools[:-1])
+
+    def test_tools_payload_is_reused_across_requests(self, agent):
+        fake = FakeMessages(TOOL_ROUND)
+        agent.client = SimpleNamespace(messages=fake)
+
+        agent.run_step("Compute and remember")
+
+        assert fake.calls[0]["tools"] is fake.calls[1]["tools"]
+        assert fake.calls[0]["tools"] is agent._tools_payload
+
+
+class TestStreaming:
+    """Tests for streaming text output."""
+
+    def test_run_step_streams_text(self, streaming_agent, capsys):
+        streaming_agent.client = SimpleNamespace(messages=FakeMessages(TOOL_ROUND))
+
+        response, tool_results = streaming_agent.run_step("Compute and remember")
+
+        assert response == "Done."
+        assert len(tool_results) == 2
+        assert "Done." in capsys.readouterr().out
+
+    def test_arun_step_streams_text(self, streaming_agent, capsys):
+        streaming_agent.aclient = SimpleNamespace(
+            messages=FakeAsyncMessages(TOOL_ROUND)
+        )
+
+        response, _ = asyncio.run(streaming_agent.arun_step("Compute and remember"))
+
+        assert response == "Done."
+        assert "Done." in capsys.readouterr().out
+
+    def test_streamed_response_is_not_printed_again(self, streaming_agent, capsys):
+        streaming_agent.client = SimpleNamespace(messages=FakeMessages(TOOL_ROUND))
+
+        response, tool_results = streaming_agent.run_step("Compute and remember")
+        capsys.readouterr()
+        streaming_agent._print_turn(response, tool_results)
+
+        assert "Done." not in capsys.readouterr().out
+
+    def test_unexpected_stop_reason_is_printed(self, streaming_agent, capsys):
+        fake = FakeMessages([message("max_tokens", text_block("Cut off"))])
+        streaming_agent.client = SimpleNamespace(messages=fake)
+
+        response, tool_results = streaming_agent.run_step("Hello")
+        streaming_agent._print_turn(response, tool_results)
+
+        assert ">> Agent: Unexpected stop reason: max_tokens" in capsys.readouterr().out
+
+
+class TestConcurrencyLimit:
+    """Tests for the semaphore around async API calls."""
+
+    def test_in_flight_calls_are_capped(self, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        monkeypatch.setenv("ANTHROPIC_MAX_CONCURRENCY", "2")
+        in_flight = []
+        peak = []
+
+        class SlowMessages:
+            async def create(self, **params):
+                in_flight.append(1)
+                peak.append(len(in_flight))
+                await asyncio.sleep(0.01)
+                in_flight.pop()
+                return message("end_turn", text_block("ok"))
+
+        agents = [AdvancedAgent() for _ in range(6)]
+        for agent in agents:
+            agent.aclient = SimpleNamespace(messages=SlowMessages())
+
+        async def run_all():
+            return await asyncio.gather(*(a.arun_step("Hi") for a in agents))
+
+        results = asyncio.run(run_all())
+
+        assert [text for text, _ in results] == ["ok"] * 6
+        assert max(peak) == 2
+
+    def test_concurrency_below_one_is_clamped(self, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        monkeypatch.setenv("ANTHROPIC_MAX_CONCURRENCY", "0")
+        agent = AdvancedAgent()
+        agent.aclient = SimpleNamespace(
+            messages=FakeAsyncMessages([message("end_turn", text_block("ok"))])
+        )
+
+        async def run():
+            return await asyncio.wait_for(agent.arun_step("Hi"), timeout=5)
+
+        assert asyncio.run(run())[0] == "ok"
+
+
+class TestInteractive:
+    """Tests for the async interactive loop."""
+
+    def test_arun_interactive_runs_until_quit(self, agent, monkeypatch, capsys):
+        inputs = iter(["Hello", "", "quit"])
+        monkeypatch.setattr("builtins.input", lambda prompt="": next(inputs))
+        agent.aclient = SimpleNamespace(
+            messages=FakeAsyncMessages([message("end_turn", text_block("Hi!"))])
+        )
+
+        asyncio.run(agent.arun_interactive())
+
+        out = capsys.readouterr().out
+        assert ">> Agent: Hi!" in out
+        assert "Goodbye!" in out
+
+    def test_arun_interactive_exits_on_eof(self, agent, monkeypatch, capsys):
+        def raise_eof(prompt=""):
+            raise EOFError
+
+        monkeypatch.setattr("builtins.input", raise_eof)
+
+        asyncio.run(agent.arun_interactive())
+
+        assert "Goodbye!" in capsys.readouterr().out
+
+
+class TestSpeculativeToolExecution:
+    """Tests for starting tools while the response is still streaming."""
+
+    def test_pure_tools_start_before_response_completes(self, streaming_agent):
+        started = {}
+        block = tool_block("t1", "calculate", {"expression": "1 + 1"})
+        streaming_agent._start_tool_future(started, [], block)
+
+        (future,) = started.values()
+        assert future.result() == {"result": 2}
+
+    def test_side_effect_tools_wait_for_tool_use(self, streaming_agent):
+        started = {}
+        block = tool_block("t1", "save_note", {"note": "Buy milk"})
+        streaming_agent._start_tool_future(started, [], block)
+
+        assert started == {}
+        assert "Buy milk" not in streaming_agent.memory
+
+    def test_reads_after_a_save_wait_for_tool_use(self, streaming_agent):
+        started, streamed = {}, []
+        save = tool_block("t1", "save_note", {"note": "Dentist Friday"})
+        search = tool_block("t2", "search_memory", {"query": "dentist"})
+        streaming_agent._start_tool_future(started, streamed, save)
+        streaming_agent._start_tool_future(started, streamed, search)
+
+        assert started == {}
+        assert streamed == ["save_note", "search_memory"]
+
+    def test_started_tools_are_reused(self, streaming_agent, monkeypatch):
+        calls = []
+        execute_tool = streaming_agent.execute_tool
+
+        def counting_execute_tool(tool_name, tool_input):
+            calls.append(tool_name)
+            return execute_tool(tool_name, tool_input)
+
+        monkeypatch.setattr(streaming_agent, "execute_tool", counting_execute_tool)
+        streaming_agent.aclient = SimpleNamespace(
+            messages=FakeAsyncMessages(TOOL_ROUND)
+        )
+
+        _, tool_results = asyncio.run(streaming_agent.arun_step("Go"))
+
+        assert sorted(calls) == ["calculate", "save_note"]
+        assert tool_results[0]["output"] == {"result": 42}
+
+
+class TestDuplicateToolCalls:
+    """Tests for sharing one execution between identical tool_use blocks."""
+
+    DUPLICATE_ROUND = [
+        message(
+            "tool_use",
+            tool_block("t1", "save_note", {"note": "Dentist Friday"}),
+            tool_block("t2", "save_note", {"note": "Dentist Friday"}),
+            tool_block("t3", "calculate", {"expression": "1 + 1"}),
+        ),
+        message("end_turn", text_block("Saved.")),
+    ]
+
+    def test_run_step_executes_duplicates_once(self, agent):
+        fake = FakeMessages(self.DUPLICATE_ROUND)
+        agent.client = SimpleNamespace(messages=fake)
+
+        _, tool_results = agent.run_step("Remember the dentist")
+
+        assert list(agent.memory) == ["Dentist Friday"]
+        assert len(tool_results) == 3
+        ids = [item["tool_use_id"] for item in fake.calls[1]["messages"][-1]["content"]]
+        assert ids == ["t1", "t2", "t3"]
+
+    def test_arun_step_executes_duplicates_once(self, agent):
+        agent.aclient = SimpleNamespace(
+            messages=FakeAsyncMessages(self.DUPLICATE_ROUND)
+        )
+
+        _, tool_results = asyncio.run(agent.arun_step("Remember the dentist"))
+
+        assert list(agent.memory) == ["Dentist Friday"]
+        assert tool_results[0]["output"] == tool_results[1]["output"]
+
+
+class TestToolStages:
+    """Tests for running side-effecting tools in block order."""
+
+    SAVE_THEN_SEARCH = [
+        message(
+            "tool_use",
+            tool_block("t1", "search_memory", {"query": "dentist"}),
+            tool_block("t2", "save_note", {"note": "Dentist Friday"}),
+            tool_block("t3", "search_memory", {"query": "dentist"}),
+            tool_block("t4", "calculate", {"expression": "1 + 1"}),
+        ),
+        message("end_turn", text_block("Saved.")),
+    ]
+
+    @pytest.fixture(params=["agent", "streaming_agent"])
+    def any_agent(self, request):
+        return request.getfixturevalue(request.param)
+
+    def test_run_step_reads_see_earlier_saves_only(self, any_agent):
+        any_agent.client = SimpleNamespace(messages=FakeMessages(self.SAVE_THEN_SEARCH))
+
+        _, tool_results = any_agent.run_step("Remember the dentist")
+
+        outputs = [r["output"] for r in tool_results]
+        assert outputs[0] == {"results": [], "count": 0}
+        assert outputs[2] == {"results": ["Dentist Friday"], "count": 1}
+        assert outputs[3] == {"result": 2}
+
+    def test_arun_step_reads_see_earlier_saves_only(self, any_agent):
+        any_agent.aclient = SimpleNamespace(
+            messages=FakeAsyncMessages(self.SAVE_THEN_SEARCH)
+        )
+
+        _, tool_results = asyncio.run(any_agent.arun_step("Remember the dentist"))
+
+        outputs = [r["output"] for r in tool_results]
+        assert outputs[0] == {"results": [], "count": 0}
+        assert outputs[2] == {"results": ["Dentist Friday"], "count": 1}
@@ -0,0 +1,102 @@
+"""Tests for BaseAgent conversation history management."""
+
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from simple_agent.advanced import AdvancedAgent
+
+
+def make_agent(monkeypatch, **kwargs):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    return AdvancedAgent(**kwargs)
+
+
+class TestHistoryWindow:
+    """Tests for the sliding window over conversation history."""
+
+    def test_missing_api_key_raises(self, monkeypatch):
+        monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+        with pytest.raises(ValueError):
+            AdvancedAgent()
+
+    def test_history_is_bounded(self, monkeypatch):
+        agent = make_agent(monkeypatch, max_history_length=4)
+        for i in range(10):
+            role = "user" if i % 2 == 0 else "assistant"
+            agent.conversation_history.append({"role": role, "content": str(i)})
+            agent._trim_history()
+
+        assert len(agent.conversation_history) <= 4
+        assert agent.conversation_history[-1]["content"] == "9"
+
+    def test_trim_keeps_user_message_first(self, monkeypatch):
+        agent = make_agent(monkeypatch, max_history_length=3)
+        for i, role in enumerate(["user", "assistant", "user", "assistant"]):
+            agent.conversation_history.append({"role": role, "content": str(i)})
+        agent._trim_history()
+
+        assert [m["content"] for m in agent.conversation_history] == ["2", "3"]
+
+    def test_unlimited_history(self, monkeypatch):
+        agent = make_agent(monkeypatch, max_history_length=0)
+        for i in range(100):
+            agent.conversation_history.append({"role": "user", "content": str(i)})
+        agent._trim_history()
+
+        assert len(agent.conversation_history) == 100
+
+    def test_clear_history(self, monkeypatch):
+        agent = make_agent(monkeypatch)
+        agent.conversation_history.append({"role": "user", "content": "hi"})
+        agent.clear_history()
+
+        assert len(agent.conversation_history) == 0
+
+
+class TestSharedHttpClient:
+    """Tests for the process-wide connection pool."""
+
+    def test_agents_share_connection_pool(self, monkeypatch):
+        first = make_agent(monkeypatch)
+        second = make_agent(monkeypatch)
+
+        async def async_pools():
+            return first.aclient._client, second.aclient._client
+
+        assert first.client._client is second.client._client
+        first_pool, second_pool = asyncio.run(async_pools())
+        assert first_pool is second_pool
+
+    def test_each_event_loop_gets_its_own_async_client(self, monkeypatch):
+        agent = make_agent(monkeypatch)
+
+        async def async_client():
+            assert agent.aclient is agent.aclient
+            return agent.aclient
+
+        first = asyncio.run(async_client())
+        second = asyncio.run(async_client())
+
+        assert first is not second
+        assert first._client is not second._client
+
+
+class TestLazyImports:
+    """Tests that importing the package doesn't pull in the Anthropic SDK."""
+
+    def test_import_does_not_load_anthropic(self):
+        code = (
+            "import sys; from simple_agent import SimpleAgent, AdvancedAgent; "
+            "assert 'anthropic' not in sys.modules; "
+            "assert 'dotenv' not in sys.modules"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_unknown_attribute_raises(self):
+        import simple_agent
+
+        with pytest.raises(AttributeError):
+            simple_agent.NotAnAgent
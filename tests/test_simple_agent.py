@@ -1,30 +1,22 @@
 """Tests for SimpleAgent parsing and action execution."""
 
+import asyncio
+import time
+from types import SimpleNamespace
+
 import pytest
 
-from simple_agent.simple import SimpleAgent  # noqa: F401
-from simple_agent.tools import ToolRegistry
+from simple_agent.simple import SimpleAgent
 
 
 class TestParseActions:
     """Tests for action parsing without requiring API calls."""
 
     @pytest.fixture
-    def parser(self):
-        """Create a minimal SimpleAgent-like object for parsing tests."""
-
-        class Parser:
-            def parse_actions(self, response_text: str) -> list[tuple[str, str]]:
-                actions = []
-                for line in response_text.split("\n"):
-                    if line.strip().startswith("ACTION:"):
-                        action_part = line.strip()[7:].strip()
-                        if ":" in action_part:
-                            tool_name, parameter = action_part.split(":", 1)
-                            actions.append((tool_name.strip(), parameter.strip()))
-                return actions
-
-        return Parser()
+    def parser(self, monkeypatch):
+        """Create a SimpleAgent for parsing tests (no API calls are made)."""
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        return SimpleAgent()
 
     def test_parse_single_action(self, parser):
         response = "ACTION: calculate: 5 + 3"
@@ -66,37 +58,64 @@ Based on the results, you have 2 notes about Python."""
         assert len(actions) == 1
         assert actions[0] == ("search_memory", "python")
 
+    def test_parse_ignores_action_without_parameter(self, parser):
+        assert parser.parse_actions("ACTION: calculate") == []
+
+    def test_parse_ignores_action_not_at_line_start(self, parser):
+        assert parser.parse_actions("Use ACTION: calculate: 1 + 1") == []
+
+    def test_parse_windows_line_endings(self, parser):
+        response = "ACTION: calculate: 1 + 1\r\nACTION: save_note: milk\r\n"
+        actions = parser.parse_actions(response)
+        assert actions == [("calculate", "1 + 1"), ("save_note", "milk")]
+
+    def test_act_executes_every_action(self, parser):
+        response = "\n".join(f"ACTION: save_note: note {i}" for i in range(50))
+        display_text, action_results = parser.act(response)
+        assert display_text == ""
+        assert len(action_results) == 50
+        assert list(parser.memory) == [f"note {i}" for i in range(50)]
+
+    def test_parse_long_whitespace_runs_in_linear_time(self, parser):
+        # A backtracking pattern takes minutes on this; a linear one, microseconds
+        response = "ACTION:" + " " * 100_000 + "x"
+        start = time.perf_counter()
+        assert parser.parse_actions(response) == []
+        assert parser.parse_actions(response + ": 1 ") == [("x", "1")]
+        assert time.perf_counter() - start < 1.0
+
+    def test_act_removes_action_lines_from_display(self, parser):
+        response = "Sure!\n  ACTION: calculate: 2 + 2\nThe answer follows.\nACTION: x"
+        display_text, action_results = parser.act(response)
+        assert display_text == "Sure!\nThe answer follows."
+        assert action_results == ["Result: 4"]
+
+    def test_act_without_actions_returns_stripped_text(self, parser):
+        display_text, results = parser.act("  Just chatting.\nNothing to do.\n")
+        assert display_text == "Just chatting.\nNothing to do."
+        assert results == []
+
+    def test_act_long_whitespace_runs_in_linear_time(self, parser):
+        response = "Hi\nACTION:" + " " * 100_000 + "x\nBye"
+        start = time.perf_counter()
+        assert parser.act(response) == ("Hi\nBye", [])
+        assert time.perf_counter() - start < 1.0
+
+    def test_parse_and_strip_matches_separate_passes(self, parser):
+        response = "Hi\nACTION: save_note: a: b\nACTION: broken\n\tACTION: calculate: 1"
+        actions, display_text = parser._parse_and_strip(response)
+        assert actions == parser.parse_actions(response)
+        assert display_text == "Hi"
+
 
 class TestExecuteAction:
     """Tests for action execution."""
 
     @pytest.fixture
-    def executor(self):
-        """Create an executor with ToolRegistry."""
-
-        class Executor:
-            def __init__(self):
-                self.tool_registry = ToolRegistry()
-
-            def execute_action(self, tool_name: str, parameter: str) -> str:
-                if tool_name == "calculate":
-                    result = self.tool_registry.calculate(parameter)
-                    if "error" in result:
-                        return f"Error: {result['error']}"
-                    return f"Result: {result['result']}"
-                elif tool_name == "save_note":
-                    self.tool_registry.save_note(parameter)
-                    return f"Saved note: {parameter}"
-                elif tool_name == "search_memory":
-                    result = self.tool_registry.search_memory(parameter)
-                    if result["count"] > 0:
-                        return "Found notes:\n" + "\n".join(
-                            f"- {n}" for n in result["results"]
-                        )
-                    return "No matching notes found."
-                return f"Error: Unknown tool '{tool_name}'"
-
-        return Executor()
+    def executor(self, monkeypatch):
+        """Create a SimpleAgent to execute actions with."""
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        return SimpleAgent()
 
     def test_execute_calculate(self, executor):
         result = executor.execute_action("calculate", "10 + 5")
@@ -125,3 +144,169 @@ class TestExecuteAction:
         result = executor.execute_action("unknown_tool", "param")
         assert "Error" in result
         assert "Unknown tool" in result
+
+    def test_subclass_handler_overrides_are_used(self, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+
+        class ShoutingAgent(SimpleAgent):
+            def _do_calc(self, parameter):
+                return super()._do_calc(parameter).upper()
+
+        assert ShoutingAgent().execute_action("calculate", "1 / 0") == (
+            "ERROR: DIVISION BY ZERO"
+        )
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """Create a SimpleAgent without a real API key."""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    return SimpleAgent()
+
+
+class FakeMessages:
+    """Fake messages endpoint that replies by prompt; unknown prompts fail."""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.calls = []
+
+    def _reply(self, params):
+        self.calls.append(params)
+        content = params["messages"][-1]["content"]
+        prompt = content if isinstance(content, str) else content[0]["text"]
+        if prompt not in self.replies:
+            raise RuntimeError("overloaded")
+        return SimpleNamespace(content=[SimpleNamespace(text=self.replies[prompt])])
+
+    def create(self, **params):
+        return self._reply(params)
+
+
+class AsyncFakeMessages(FakeMessages):
+    """Async FakeMessages that answers the first prompt last."""
+
+    async def create(self, **params):
+        first = next(iter(self.replies), None)
+        # Finish in reverse order to check results are not reordered
+        await asyncio.sleep(0.01 if params["messages"][-1]["content"] == first else 0)
+        return self._reply(params)
+
+
+class FakeBatches:
+    """Fake messages.batches endpoint that finishes after one poll."""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.requests = None
+        self.polls = 0
+
+    def create(self, requests):
+        self.requests = requests
+        return SimpleNamespace(id="batch-1", processing_status="in_progress")
+
+    def retrieve(self, batch_id):
+        self.polls += 1
+        return SimpleNamespace(id=batch_id, processing_status="ended")
+
+    def results(self, batch_id):
+        # Results may arrive in any order
+        for i, text in reversed(list(enumerate(self.texts))):
+            if text is None:
+                result = SimpleNamespace(type="errored")
+            else:
+                message = SimpleNamespace(content=[SimpleNamespace(text=text)])
+                result = SimpleNamespace(type="succeeded", message=message)
+            yield SimpleNamespace(custom_id=f"turn-{i}", result=result)
+
+
+class TestBatchRun:
+    """Tests for SimpleAgent.batch_run using a fake client."""
+
+    def test_batch_run_returns_results_in_prompt_order(self, agent):
+        batches = FakeBatches(
+            [
+                "Saving it.\nACTION: save_note: dentist Friday",
+                "Searching.\nACTION: search_memory: dentist",
+                None,
+            ]
+        )
+        agent.client = SimpleNamespace(messages=SimpleNamespace(batches=batches))
+
+        outputs = agent.batch_run(["save", "search", "fails"], poll_interval=0)
+
+        assert [r["custom_id"] for r in batches.requests] == [
+            "turn-0",
+            "turn-1",
+            "turn-2",
+        ]
+        assert batches.polls == 1
+        assert outputs[0] == ("Saving it.", ["Saved note: dentist Friday"])
+        assert outputs[1][1] == ["Found notes:\n- dentist Friday"]
+        assert outputs[2][0].startswith("Error")
+
+
+class TestAbatchRun:
+    """Tests for SimpleAgent.abatch_run using a fake async client."""
+
+    def test_abatch_run_returns_results_in_prompt_order(self, agent):
+        messages = AsyncFakeMessages(
+            {
+                "save": "Saving it.\nACTION: save_note: dentist Friday",
+                "search": "Searching.\nACTION: search_memory: dentist",
+            }
+        )
+        agent.aclient = SimpleNamespace(messages=messages)
+
+        outputs = asyncio.run(agent.abatch_run(["save", "search", "fails"]))
+
+        assert outputs[0] == ("Saving it.", ["Saved note: dentist Friday"])
+        assert outputs[1][1] == ["Found notes:\n- dentist Friday"]
+        assert outputs[2] == ("Error: overloaded", [])
+
+
+class TestThink:
+    """Tests for how think() records the conversation."""
+
+    def test_failed_request_leaves_history_untouched(self, agent):
+        agent.client = SimpleNamespace(messages=FakeMessages({}))
+
+        with pytest.raises(RuntimeError):
+            agent.think("Hello")
+
+        assert len(agent.conversation_history) == 0
+
+
+class TestArunStep:
+    """Tests for the default async wrapper around run_step."""
+
+    def test_arun_step_runs_sync_loop(self, agent):
+        messages = FakeMessages({"What is 6*7?": "ACTION: calculate: 6*7"})
+        agent.client = SimpleNamespace(messages=messages)
+
+        response, action_results = asyncio.run(agent.arun_step("What is 6*7?"))
+
+        assert response == ""
+        assert action_results == ["Result: 42"]
+
+
+class TestPromptCaching:
+    """Tests for cache_control markers on SimpleAgent requests."""
+
+    def test_think_marks_system_prompt_and_latest_turn(self, agent):
+        messages = FakeMessages({"Hello": "Hi!"})
+        agent.client = SimpleNamespace(messages=messages)
+
+        agent.think("Hello")
+
+        (system,) = messages.calls[0]["system"]
+        assert system["text"] == agent.get_system_prompt()
+        assert system["cache_control"] == {"type": "ephemeral"}
+        (block,) = messages.calls[0]["messages"][-1]["content"]
+        assert block == {
+            "type": "text",
+            "text": "Hello",
+            "cache_control": {"type": "ephemeral"},
+        }
+        # History itself keeps plain string content
+        assert agent.conversation_history[0] == {"role": "user", "content": "Hello"}
@@ -2,6 +2,7 @@
 
 import pytest
 
+from simple_agent import tools
 from simple_agent.tools import ToolRegistry, TOOL_SCHEMAS
 
 
@@ -43,6 +44,26 @@ class TestToolRegistry:
         result = registry.calculate("")
         assert "error" in result
 
+    def test_calculate_surrounding_whitespace(self, registry):
+        result = registry.calculate("  2 + 3  ")
+        assert result == {"result": 5}
+
+    def test_calculate_division_by_zero(self, registry):
+        result = registry.calculate("1 / 0")
+        assert result == {"error": "Division by zero"}
+
+    def test_calculate_repeated_expression_is_cached(self, registry):
+        registry.calculate("2^10")
+        result = registry.calculate("2^10")
+        assert result == {"result": 1024}
+        assert registry._evaluator._evaluate_cached.cache_info().hits == 1
+
+    def test_calculate_errors_are_not_cached(self, registry):
+        registry.calculate("5 + abc")
+        result = registry.calculate("5 + abc")
+        assert "error" in result
+        assert registry._evaluator._evaluate_cached.cache_info().currsize == 0
+
     # --- save_note tests ---
 
     def test_save_note_success(self, registry):
@@ -57,6 +78,18 @@ class TestToolRegistry:
         assert "First note" in registry.memory
         assert "Second note" in registry.memory
 
+    def test_save_note_drops_oldest_beyond_cap(self, monkeypatch):
+        monkeypatch.setattr(tools, "MAX_NOTES", 2)
+        registry = ToolRegistry()
+        registry.save_note("Dentist Friday")
+        registry.save_note("Call mom")
+        registry.save_note("Dentist Monday")
+        assert list(registry.memory) == ["Call mom", "Dentist Monday"]
+        assert registry.search_memory("dentist")["results"] == ["Dentist Monday"]
+        assert registry.search_memory("mom")["results"] == ["Call mom"]
+        assert "friday" not in registry._index
+        assert registry.search_memory_bullets("dentist") == ["- Dentist Monday"]
+
     # --- search_memory tests ---
 
     def test_search_memory_finds_match(self, registry):
@@ -88,6 +121,44 @@ class TestToolRegistry:
         result = registry.search_memory("python")
         assert result["count"] == 2
 
+    def test_search_memory_partial_word(self, registry):
+        registry.save_note("Meeting at 3pm")
+        result = registry.search_memory("meet")
+        assert result["results"] == ["Meeting at 3pm"]
+
+    def test_search_memory_phrase(self, registry):
+        registry.save_note("Call mom tonight")
+        registry.save_note("Mom called")
+        result = registry.search_memory("call mom")
+        assert result["results"] == ["Call mom tonight"]
+
+    def test_search_memory_phrase_with_partial_words(self, registry):
+        registry.save_note("Team meeting at 3pm today")
+        registry.save_note("Meeting moved, at home by 3")
+        result = registry.search_memory("eting at 3p")
+        assert result["results"] == ["Team meeting at 3pm today"]
+
+    def test_search_memory_punctuation_only(self, registry):
+        registry.save_note("Done!")
+        registry.save_note("Done")
+        assert registry.search_memory("!")["results"] == ["Done!"]
+
+    def test_search_memory_bullets(self, registry):
+        registry.save_note("Meeting at 3pm")
+        registry.save_note("Call mom")
+        registry.save_note("Team meeting moved")
+        assert registry.search_memory_bullets("meeting") == [
+            "- Meeting at 3pm",
+            "- Team meeting moved",
+        ]
+        assert registry.search_memory_bullets("dentist") == []
+
+    def test_search_memory_keeps_save_order(self, registry):
+        registry.save_note("zeta python")
+        registry.save_note("alpha python")
+        result = registry.search_memory("python")
+        assert result["results"] == ["zeta python", "alpha python"]
+
 
 class TestToolSchemas:
     """Tests for TOOL_SCHEMAS structure."""